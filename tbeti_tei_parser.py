@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+"""Parser for the TEI transcription of the Tbeti Sulta Matiane (ტბეთის სულთა მატიანე).
+
+Reads the TEI P5 XML transcription of the manuscript, extracts the
+commemorative entries with their persons, family relations, places and
+manuscript references, and exports the result as JSON and as the
+JavaScript data object consumed by the web edition (index.html).
+
+Usage:
+    python tbeti_tei_parser.py tbeti.xml
+"""
+
+import concurrent.futures
+import functools
+import json
+import mmap
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+
+# Prefer lxml: libxml2's C parser is an order of magnitude faster than the
+# pure-Python ElementTree walk on large TEI files, and its compiled XPath
+# replaces the Python-level findall. The stdlib remains as a fallback so
+# the script still runs without the dependency.
+try:
+    from lxml import etree as ET
+    _HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _HAVE_LXML = False
+
+# Same idea for serialization: orjson encodes in C, several times faster
+# than the stdlib json encoder on a full entry list.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The raw-text fallback drags DOTALL patterns across the whole file;
+# google-re2 compiles them to a DFA and scans in linear time with no
+# backtracking. The patterns below are re2-compatible, so the stdlib
+# engine slots in unchanged when re2 is not installed.
+try:
+    import re2 as _fallback_re
+except ImportError:
+    _fallback_re = re
+
+TEI_NS = {'tei': 'http://www.tei-c.org/ns/1.0'}
+
+XMLParseError = ET.XMLSyntaxError if _HAVE_LXML else ET.ParseError
+
+# All patterns are compiled once at import time; the extractors below run
+# once per entry (and per person/place candidate), so recompiling them
+# inside the methods would dominate the text path on large transcriptions.
+
+# Georgian script block.
+_GEORGIAN_RE = re.compile(r'[\u10A0-\u10FF]+')
+
+# Name formations: patronymics (-შვილი / -ძე compounds and the genitive
+# -ეთ forms) and later surnames (-აძე, -ავაძე, -ელი), fused into a single
+# alternation so one finditer pass replaces twelve separate scans of the
+# same text.  The pat_/sur_ prefix of the group name says which bucket a
+# match belongs to.
+_NAME_PATTERNS = (
+    ('pat_isshvili', r'[\u10A0-\u10FF]+ისშვილი'),
+    ('pat_shvili', r'[\u10A0-\u10FF]+შვილი'),
+    ('pat_anisdze', r'[\u10A0-\u10FF]+ანისძე'),
+    ('pat_isdze', r'[\u10A0-\u10FF]+ისძე'),
+    ('pat_sdze', r'[\u10A0-\u10FF]+სძე'),
+    ('pat_dze', r'[\u10A0-\u10FF]+ძე'),
+    ('pat_aet', r'[\u10A0-\u10FF]+აეთ'),
+    ('pat_eti', r'[\u10A0-\u10FF]+ეთი'),
+    ('pat_et', r'[\u10A0-\u10FF]+ეთ'),
+    ('sur_avadze', r'[\u10A0-\u10FF]+ავაძე'),
+    ('sur_adze', r'[\u10A0-\u10FF]+აძე'),
+    ('sur_eli', r'[\u10A0-\u10FF]+ელი'),
+)
+_NAME_RE = re.compile(
+    '|'.join(f'(?P<{tag}>{body})' for tag, body in _NAME_PATTERNS))
+
+# Family relations: kinship term in the genitive followed by a name.
+_FAMILY_RES = [(re.compile(p), t, r) for p, t, r in (
+    (r'მეუღლ[ეი]სა\s+([\u10A0-\u10FF]+)', 'spouse', 'wife'),
+    (r'ასულისა\s+([\u10A0-\u10FF]+)', 'child', 'daughter'),
+    (r'ძისა\s+([\u10A0-\u10FF]+)', 'child', 'son'),
+    (r'დედისა\s+([\u10A0-\u10FF]+)', 'parent', 'mother'),
+    (r'მამისა\s+([\u10A0-\u10FF]+)', 'parent', 'father'),
+    (r'დისა\s+([\u10A0-\u10FF]+)', 'sibling', 'sister'),
+    (r'ძმისა\s+([\u10A0-\u10FF]+)', 'sibling', 'brother'),
+)]
+
+# Suffix sets and gazetteer shared by the name/place classifiers.
+# str.endswith accepts a tuple and tests every suffix in a single C call.
+_PATRONYMIC_SUFFIXES = ('შვილი', 'სძე', 'იძე', 'ძე', 'ისშვილი', 'ანისძე',
+                        'ეთ', 'ეთი', 'აეთ', 'იეთ', 'უეთ', 'ანთ', 'ინთ')
+_SURNAME_SUFFIXES = ('აძე', 'ავაძე', 'ელი')
+_KNOWN_PLACES = frozenset(('მცხეთა', 'თბილისი', 'ქუთაისი', 'ტბეთი',
+                           'შავშეთი', 'კლარჯეთი', 'ტაო', 'არტანუჯი'))
+
+# Toponyms worth a substring search in every entry body, fused into one
+# alternation so a single pass replaces a scan per toponym.
+_KNOWN_PLACES_SHORT = ('მცხეთა', 'თბილისი', 'ქუთაისი', 'ტბეთი')
+_KNOWN_PLACES_RE = re.compile('|'.join(map(re.escape, _KNOWN_PLACES_SHORT)))
+
+# Ecclesiastical titles classifying the commemorated person, scanned as
+# one alternation. First title found in the text wins.
+_TYPE_MAP = {
+    'მახარებელ': 'evangelist',
+    'ეპისკოპოს': 'bishop',
+    'მღვდელ': 'priest',
+    'ბერ': 'monk',
+}
+_TYPE_RE = re.compile('|'.join(_TYPE_MAP))
+
+# Occupation labels used by the edition, keyed by person type.
+_OCCUPATION_MAP = {
+    'evangelist': 'evangelist',
+    'bishop': 'bishop',
+    'priest': 'priest',
+    'monk': 'monk',
+    'deacon': 'deacon',
+    'ktitor': 'ktitor',
+}
+
+# Editorial markup left over from the transcription layer; a translate
+# table deletes the fixed characters in a single C pass over the string.
+_DEL_TABLE = str.maketrans('', '', '{}[]\\')
+_WS_RE = re.compile(r'\s+')
+
+# Scribal abbreviations expanded in the edition, folded into one
+# alternation so a single scan replaces three.
+_ABBREV_MAP = {
+    'ს(ულს)ა': 'სულსა',
+    'შ(ეუნდვე)ნ': 'შეუნდვენ',
+    'ღ(მერთმა)ნ': 'ღმერთმან',
+}
+_ABBREV_RE = re.compile('|'.join(map(re.escape, _ABBREV_MAP)))
+
+# Manuscript references: folio numbers (12r / 12v) and line counts.
+_FOLIO_RE = re.compile(r'(\d+[rv])')
+_LINE_RE = re.compile(r'სტრიქონი\s*(\d+)')
+
+# Inline placeName tags surviving in the plain-text fallback.
+_PLACENAME_RE = re.compile(r'<placeName[^>]*>([^<]+)</placeName>')
+
+# Fallback extraction when the file is not well-formed XML. The entry
+# pattern works on bytes so it can run directly over the mmap'd file.
+_ENTRY_RE = _fallback_re.compile(
+    rb'<entry[^>]*n="(\d+)"[^>]*>(.*?)</entry>', _fallback_re.DOTALL)
+_GEORGIAN_LINE_RE = _fallback_re.compile(
+    r'[\u10A0-\u10FF][^\n]*(?:მეუღლე|შვილი|ასული|ძმა|და)[^\n]*')
+
+
+def _dumps(data):
+    """Serialize to pretty-printed JSON, through orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _to_int(value, fallback):
+    """Parse an entry number in one pass, using fallback on bad input."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return fallback
+
+
+# The same names recur across dozens of entries, so the classifiers are
+# memoized per unique string; keys are short Georgian words and hashing
+# them is far cheaper than re-running the suffix tests.
+@functools.lru_cache(maxsize=4096)
+def _is_patronymic(name):
+    return name.endswith(_PATRONYMIC_SUFFIXES)
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_actual_place(name):
+    if name.endswith(_PATRONYMIC_SUFFIXES) or name.endswith(_SURNAME_SUFFIXES):
+        return False
+    return name in _KNOWN_PLACES
+
+
+@dataclass(slots=True)
+class Entry:
+    """One commemorative entry of the matiane.
+
+    A slotted dataclass instead of a per-entry dict: construction is
+    cheaper, the memory layout is fixed, and the field names mirror the
+    keys of the exported JSON.
+    """
+
+    entryId: str
+    entryNumber: int
+    mainPerson: dict = field(default_factory=dict)
+    familyMembers: list = field(default_factory=list)
+    manuscript: dict = field(default_factory=dict)
+    edition: dict = field(default_factory=dict)
+    dates: dict = field(default_factory=dict)
+    notes: str = ''
+    places: list = field(default_factory=list)
+
+
+class TbetiTEIParser:
+    """Extracts entries, persons and places from the Tbeti TEI transcription."""
+
+    def __init__(self):
+        self.entries = []
+        self.statistics = {
+            'total_entries': 0,
+            'unique_persons': set(),
+            'patronymics': set(),
+            'places': set(),
+            'occupations': set(),
+        }
+        # Serialized entries blob, shared by the JSON and JS exports.
+        self._entries_json = None
+
+    # ------------------------------------------------------------------
+    # XML path
+    # ------------------------------------------------------------------
+
+    def parse_xml_file(self, xml_file_path):
+        """Parse the TEI file, falling back to raw-text extraction on errors."""
+        try:
+            self.parse_xml_tree(xml_file_path)
+        except XMLParseError as exc:
+            print(f'XML parse failed ({exc}), falling back to text extraction',
+                  file=sys.stderr)
+            # iterparse streams entries into self.entries as it goes, so a
+            # file that breaks late leaves the already-parsed prefix
+            # behind; drop it or the fallback would append every entry a
+            # second time.
+            self.entries.clear()
+            for bucket in self.statistics.values():
+                if isinstance(bucket, set):
+                    bucket.clear()
+            self.extract_from_text(xml_file_path)
+
+    def iter_entry_elements(self, xml_file_path):
+        """Stream tei:entry subtrees with iterparse, one at a time.
+
+        Memory stays bounded by a single entry instead of the whole
+        document: each subtree is cleared once the caller is done with
+        it, and under lxml the already-consumed siblings are dropped
+        from the partially built tree as well.
+        """
+        for _event, elem in ET.iterparse(xml_file_path, events=('end',)):
+            if elem.tag.endswith('}entry'):
+                yield elem
+                elem.clear()
+                if _HAVE_LXML:
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+
+    def parse_xml_tree(self, xml_file_path):
+        """Walk every tei:entry element of the document incrementally.
+
+        Entries are independent of each other, so on multi-core machines
+        the CPU-bound extraction is fanned out to a process pool: each
+        streamed fragment is re-serialized to a small blob, re-parsed in
+        a worker and returned as a finished Entry. map() preserves
+        submission order, and the statistics are still reduced once over
+        the merged list.
+        """
+        entry_elems = self.iter_entry_elements(xml_file_path)
+        workers = os.cpu_count() or 1
+        if workers > 1:
+            blobs = ((ET.tostring(entry_elem), i)
+                     for i, entry_elem in enumerate(entry_elems, 1))
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers) as pool:
+                for entry in pool.map(_parse_entry_blob, blobs, chunksize=64):
+                    if entry:
+                        self.entries.append(entry)
+        else:
+            for i, entry_elem in enumerate(entry_elems, 1):
+                entry = self.parse_entry_element(entry_elem, i)
+                if entry:
+                    self.entries.append(entry)
+        self.calculate_statistics()
+
+    def parse_entry_element(self, entry_elem, index):
+        """Build one entry record from a tei:entry element."""
+        number = _to_int(entry_elem.get('n'), index)
+
+        entry = Entry(entryId=f'entry_{number:03d}', entryNumber=number)
+
+        full_text = ''.join(entry_elem.itertext())
+        full_text = self.clean_text(full_text)
+        if not full_text:
+            return None
+        entry.edition['text'] = full_text
+
+        # One walk over the subtree buckets the marked-up elements that
+        # used to take four separate findall traversals.
+        pers_names, place_names, lbs, pbs = [], [], [], []
+        for elem in entry_elem.iter():
+            tag = elem.tag
+            if not isinstance(tag, str):
+                continue  # comments / processing instructions under lxml
+            tag = tag.rpartition('}')[2]
+            if tag == 'persName':
+                pers_names.append(elem)
+            elif tag == 'placeName':
+                place_names.append(elem)
+            elif tag == 'lb':
+                lbs.append(elem)
+            elif tag == 'pb':
+                pbs.append(elem)
+
+        # Marked-up names take precedence over the heuristic extractors.
+        for pers_elem in pers_names:
+            name = self.clean_text(''.join(pers_elem.itertext()))
+            if not name:
+                continue
+            if not entry.mainPerson.get('name'):
+                entry.mainPerson['name'] = name
+            else:
+                entry.familyMembers.append({'name': name, 'relation': ''})
+        for place_elem in place_names:
+            place = self.clean_text(''.join(place_elem.itertext()))
+            if place and place not in entry.places:
+                entry.places.append(place)
+
+        self.extract_main_person_from_text(full_text, entry)
+        self.extract_family_from_text(full_text, entry)
+        self.extract_places_from_text(full_text, entry)
+        self.extract_manuscript_from_text(full_text, entry)
+        self.parse_manuscript_refs(lbs, pbs, entry)
+        return entry
+
+    def parse_manuscript_refs(self, lbs, pbs, entry):
+        """Record line and page breaks of the entry in the manuscript."""
+        if lbs:
+            entry.manuscript['lines'] = len(lbs)
+        if pbs:
+            folio = pbs[0].get('n', '')
+            if folio:
+                entry.manuscript['folio'] = folio
+
+    # ------------------------------------------------------------------
+    # Text extractors
+    # ------------------------------------------------------------------
+
+    def clean_text(self, text):
+        """Strip editorial markup, normalise whitespace, expand abbreviations."""
+        if not text:
+            return ''
+        text = text.translate(_DEL_TABLE)
+        text = _WS_RE.sub(' ', text)
+        text = _ABBREV_RE.sub(lambda m: _ABBREV_MAP[m.group()], text)
+        return text.strip()
+
+    def extract_main_person_from_text(self, text, entry):
+        """Identify the commemorated (main) person of the entry."""
+        name = entry.mainPerson.get('name', '')
+        if not name:
+            match = _GEORGIAN_RE.search(text)
+            if match:
+                name = match.group()
+        if not name:
+            return
+        person_type = self.determine_person_type(text)
+        patronymics, surnames = self.scan_names(text)
+        entry.mainPerson = {
+            'name': name,
+            'patronymic': patronymics[0] if patronymics else '',
+            'surname': surnames[0] if surnames else '',
+            'type': person_type,
+            'occupation': self.get_occupation_from_type(person_type),
+        }
+
+    def scan_names(self, text):
+        """Collect patronymic and surname formations in one pass over the text."""
+        patronymics = []
+        surnames = []
+        for match in _NAME_RE.finditer(text):
+            if match.lastgroup.startswith('pat_'):
+                patronymics.append(match.group())
+            else:
+                surnames.append(match.group())
+        return patronymics, surnames
+
+    def extract_family_from_text(self, text, entry):
+        """Collect family members named after kinship terms."""
+        for family_re, member_type, relation in _FAMILY_RES:
+            for name in family_re.findall(text):
+                if self.is_patronymic(name):
+                    continue
+                if any(m['name'] == name for m in entry.familyMembers):
+                    continue
+                entry.familyMembers.append({
+                    'name': name,
+                    'type': member_type,
+                    'relation': relation,
+                })
+
+    def extract_places_from_text(self, text, entry):
+        """Collect place names mentioned in the entry text."""
+        # entry.places stays a list for the JSON output; membership is
+        # tracked in a parallel set so the dedup check is O(1) instead of
+        # rescanning the list for every candidate.
+        places_set = set(entry.places)
+        for place in _PLACENAME_RE.findall(text):
+            place = place.strip()
+            if place and place not in places_set:
+                entry.places.append(place)
+                places_set.add(place)
+        for place in _KNOWN_PLACES_RE.findall(text):
+            if place not in places_set:
+                entry.places.append(place)
+                places_set.add(place)
+
+    def extract_manuscript_from_text(self, text, entry):
+        """Pick up folio / line references embedded in the entry text."""
+        folios = _FOLIO_RE.findall(text)
+        if folios and 'folio' not in entry.manuscript:
+            entry.manuscript['folio'] = folios[0]
+        lines = _LINE_RE.findall(text)
+        if lines:
+            entry.manuscript['line'] = lines[0]
+
+    # ------------------------------------------------------------------
+    # Classification
+    # ------------------------------------------------------------------
+
+    def is_patronymic(self, name):
+        """True if the name looks like a patronymic rather than a given name."""
+        return _is_patronymic(name)
+
+    def is_actual_place(self, name):
+        """True if the name is a known toponym and not a person name."""
+        return _is_actual_place(name)
+
+    def determine_person_type(self, text):
+        """Classify the main person by ecclesiastical title, if any."""
+        # Georgian script has no case distinction, so the old .lower()
+        # copy of the whole entry text was pure allocation.
+        match = _TYPE_RE.search(text)
+        return _TYPE_MAP[match.group()] if match else 'main'
+
+    def get_occupation_from_type(self, person_type):
+        """Map a person type to the occupation label used by the edition."""
+        return _OCCUPATION_MAP.get(person_type, '')
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+
+    def calculate_statistics(self):
+        """Aggregate per-entry data into the edition-level statistics."""
+        self.statistics['total_entries'] = len(self.entries)
+        # Local memo for the place classification: most entries repeat the
+        # same handful of toponyms, and a dict hit here is cheaper than
+        # going back through the classifier methods every time.
+        place_ok = {}
+        for entry in self.entries:
+            main = entry.mainPerson
+            if main.get('name'):
+                self.statistics['unique_persons'].add(main['name'])
+            if main.get('patronymic'):
+                self.statistics['patronymics'].add(main['patronymic'])
+            if main.get('occupation'):
+                self.statistics['occupations'].add(main['occupation'])
+            for member in entry.familyMembers:
+                if member.get('name'):
+                    self.statistics['unique_persons'].add(member['name'])
+            for place in entry.places:
+                ok = place_ok.get(place)
+                if ok is None:
+                    ok = (self.is_actual_place(place)
+                          and not self.is_patronymic(place))
+                    place_ok[place] = ok
+                if ok:
+                    self.statistics['places'].add(place)
+
+    # ------------------------------------------------------------------
+    # Plain-text fallback
+    # ------------------------------------------------------------------
+
+    def extract_from_text(self, xml_file_path):
+        """Recover entries from a file that failed to parse as XML."""
+        # mmap gives zero-copy access to the page cache instead of reading
+        # and UTF-8-decoding the whole file up front; only the slices that
+        # actually match the entry pattern are decoded.
+        with open(xml_file_path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # zero-length file
+                self.calculate_statistics()
+                return
+            with mm:
+                for match in _ENTRY_RE.finditer(mm):
+                    entry = self.parse_entry_from_text(
+                        match.group(1).decode('ascii'),
+                        match.group(2).decode('utf-8'))
+                    if entry:
+                        self.entries.append(entry)
+        self.calculate_statistics()
+
+    def parse_entry_from_text(self, entry_number, body):
+        """Build one entry record from a raw <entry> text fragment."""
+        number = _to_int(entry_number, len(self.entries) + 1)
+
+        text = self.clean_text(body)
+        if not text:
+            return None
+
+        entry = Entry(entryId=f'entry_{number:03d}', entryNumber=number,
+                      edition={'text': text})
+
+        commemorations = _GEORGIAN_LINE_RE.findall(body)
+        if commemorations:
+            entry.notes = ' / '.join(commemorations[:3])
+
+        self.extract_main_person_from_text(text, entry)
+        self.extract_family_from_text(text, entry)
+        self.extract_places_from_text(body, entry)
+        self.extract_manuscript_from_text(text, entry)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def _serialize_entries(self):
+        """Serialize self.entries once; both exporters reuse the blob."""
+        if self._entries_json is None:
+            self._entries_json = _dumps([asdict(e) for e in self.entries])
+        return self._entries_json
+
+    def export_to_json(self, output_path):
+        """Write entries plus statistics as a JSON document."""
+        statistics = {
+            'totalEntries': self.statistics['total_entries'],
+            'uniquePersons': sorted(self.statistics['unique_persons']),
+            'patronymics': sorted(self.statistics['patronymics']),
+            'places': sorted(self.statistics['places']),
+            'occupations': sorted(self.statistics['occupations']),
+        }
+        # Compose the document around the shared entries blob so the
+        # heaviest serialization runs once across both exports.
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('{\n"entries": ')
+            f.write(self._serialize_entries())
+            f.write(',\n"statistics": ')
+            f.write(_dumps(statistics))
+            f.write('\n}\n')
+        print(f'wrote {output_path} ({len(self.entries)} entries)')
+
+    def export_to_javascript(self, output_path):
+        """Write the teiData object embedded by index.html."""
+        entries_json = self._serialize_entries()
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('// Generated by tbeti_tei_parser.py — do not edit.\n')
+            f.write('const teiData = {\n')
+            f.write(f'  "entries": {entries_json}\n')
+            f.write('};\n')
+        print(f'wrote {output_path}')
+
+
+# Worker-side parser for the process pool; parse_entry_element keeps no
+# per-document state, so one instance per worker process is enough.
+_WORKER_PARSER = TbetiTEIParser()
+
+
+def _parse_entry_blob(blob_and_index):
+    """Re-parse one serialized tei:entry fragment in a pool worker."""
+    blob, index = blob_and_index
+    return _WORKER_PARSER.parse_entry_element(ET.fromstring(blob), index)
+
+
+def main():
+    xml_file = sys.argv[1] if len(sys.argv) > 1 else 'tbeti.xml'
+    parser = TbetiTEIParser()
+    parser.parse_xml_file(xml_file)
+    parser.export_to_json('tbeti_data.json')
+    parser.export_to_javascript('tbeti_data.js')
+
+
+if __name__ == '__main__':
+    main()